@@ -4,8 +4,11 @@ import asyncio
 import logging as log
 import sys
 import traceback
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, DefaultDict, Dict, List, Optional
+from time import time
+from typing import Any, DefaultDict, Dict, List, Optional, Tuple
+from weakref import WeakValueDictionary
 
 import nio
 from appdirs import AppDirs
@@ -17,13 +20,25 @@ from .media_cache import MediaCache
 from .models import SyncId
 from .models.items import Account
 from .models.model_store import ModelStore
-from .user_files import Accounts, History, Theme, UISettings, UIState
+from .user_files import (
+    MAX_CACHED_PROFILES, Accounts, History, ProfileCache, Theme, UISettings,
+    UIState,
+)
+from .utils import weak_lock
 
 # Logging configuration
 log.getLogger().setLevel(log.INFO)
 nio.logger_group.level = nio.log.logbook.ERROR
 nio.log.logbook.StreamHandler(sys.stderr).push_application()
 
+# Cached profiles younger than this many seconds are returned as-is
+PROFILE_FRESH_TTL = 600
+# Older cached profiles are returned, but refreshed in the background.
+# Past this age, they are fetched again before being returned.
+PROFILE_STALE_TTL = 3 * 86400
+
+CachedProfile = Tuple[float, nio.ProfileGetResponse]
+
 
 class Backend:
     """Manage matrix clients and provide other useful general methods.
@@ -38,6 +53,9 @@ class Backend:
         history: User data file for saving/restoring text typed into QML
             components.
 
+        saved_profiles: Cache file for saving/restoring `profile_cache`
+            across restarts.
+
         models: A mapping containing our data models that are
             synchronized between the Python backend and the QML UI.
             The models should only ever be modified from the backend.
@@ -66,6 +84,13 @@ class Backend:
         clients: A `{user_id: MatrixClient}` dict for the logged-in clients
             we managed. Every client is logged to one matrix account.
 
+        any_client_syncing: An event set while at least one of our `clients`
+            is syncing, see `get_any_client()`.
+
+        profile_cache: A `{user_id: (fetch_time, ProfileGetResponse)}`
+            ordered dict of fetched profiles, from least to most recently
+            used. See `get_profile()`.
+
         media_cache: A matrix media cache for downloaded files.
     """
 
@@ -77,19 +102,43 @@ class Backend:
         self.ui_state:       UIState    = UIState(self)
         self.history:        History    = History(self)
 
+        self.saved_profiles: ProfileCache = ProfileCache(self)
+
         self.models:  ModelStore              = ModelStore()
         self.clients: Dict[str, MatrixClient] = {}
 
-        self.profile_cache: Dict[str, nio.ProfileGetResponse] = {}
-        self.get_profile_locks: DefaultDict[str, asyncio.Lock] = \
-                DefaultDict(asyncio.Lock)  # {user_id: lock}
+        # Immutable copy of clients.values(), updated when clients changes
+        self._clients_snapshot: Tuple[MatrixClient, ...] = ()
+
+        # Held while registering or unregistering clients
+        self._clients_lock: asyncio.Lock = asyncio.Lock()
 
-        self.send_locks: DefaultDict[str, asyncio.Lock] = \
-                DefaultDict(asyncio.Lock)  # {room_id: lock}
+        self._client_ready: DefaultDict[str, asyncio.Event] = \
+                DefaultDict(asyncio.Event)  # {user_id: event}
+
+        self.any_client_syncing:   asyncio.Event          = asyncio.Event()
+        self._last_healthy_client: Optional[MatrixClient] = None
+
+        self.profile_cache: "OrderedDict[str, CachedProfile]" = OrderedDict()
+        self._profile_cache_dirty: bool = False
+
+        self._profile_refreshing: Dict[str, asyncio.Future] = {}
+        self._profile_queue:      Dict[str, asyncio.Future] = {}
+        self._profile_sent:       Dict[str, asyncio.Future] = {}
+        self._profile_queued:     asyncio.Event             = asyncio.Event()
+
+        self.get_profile_locks: "WeakValueDictionary[str, asyncio.Lock]" = \
+                WeakValueDictionary()  # {user_id: lock}
+
+        self.send_locks: "WeakValueDictionary[str, asyncio.Lock]" = \
+                WeakValueDictionary()  # {room_id: lock}
 
         cache_dir                    = Path(self.appdirs.user_cache_dir)
         self.media_cache: MediaCache = MediaCache(self, cache_dir)
 
+        asyncio.ensure_future(self._profile_fetcher_loop())
+        asyncio.ensure_future(self._load_saved_profiles())
+
 
     def __repr__(self) -> str:
         return f"{type(self).__name__}(clients={self.clients!r})"
@@ -115,8 +164,9 @@ class Backend:
             await client.close()
             raise
 
-        self.clients[client.user_id]            = client
-        self.models["accounts"][client.user_id] = Account(client.user_id)
+        async with self._clients_lock:
+            self._register_client(client.user_id, client)
+
         return client.user_id
 
 
@@ -132,8 +182,8 @@ class Backend:
             user=user_id, homeserver=homeserver, device_id=device_id,
         )
 
-        self.clients[user_id]            = client
-        self.models["accounts"][user_id] = Account(user_id)
+        async with self._clients_lock:
+            self._register_client(user_id, client)
 
         await client.resume(user_id=user_id, token=token, device_id=device_id)
 
@@ -157,69 +207,332 @@ class Backend:
 
 
     async def logout_client(self, user_id: str) -> None:
-        """Log a `MatrixClient` out and unregister it from our models."""
+        """Log a `MatrixClient` out and unregister it from our models.
+
+        The client is unregistered under the clients lock, but the server
+        logout happens after releasing it, to not block other accounts'
+        registration if the server is unreachable.
+        """
+
+        async with self._clients_lock:
+            client                 = self.clients.pop(user_id, None)
+            self._clients_snapshot = tuple(self.clients.values())
+            self._client_ready[user_id].clear()
+
+            if client is self._last_healthy_client:
+                self._last_healthy_client = None
+
+            if client:
+                self.models["accounts"].pop(user_id, None)
 
-        client = self.clients.pop(user_id, None)
         if client:
-            self.models["accounts"].pop(user_id, None)
             await client.logout()
 
-        await self.saved_accounts.delete(user_id)
+        # Don't delete the account if it was logged in again in the meantime
+        if user_id not in self.clients:
+            await self.saved_accounts.delete(user_id)
+
+
+    def _register_client(self, user_id: str, client: MatrixClient) -> None:
+        """Add a client to `clients` and our models, wake up its waiters.
+
+        Must be called with the clients lock held.
+        """
+
+        self.clients[user_id]            = client
+        self.models["accounts"][user_id] = Account(user_id)
+        self._clients_snapshot           = tuple(self.clients.values())
+        self._client_ready[user_id].set()
+
+        # The client may have started syncing while we waited for the lock
+        if client.syncing:
+            self.any_client_syncing.set()
 
 
     async def get_client(self, user_id: str) -> MatrixClient:
         """Wait until a `MatrixClient` is registered in model and return it."""
 
-        failures = 0
+        waited = 0
 
         while True:
             if user_id in self.clients:
                 return self.clients[user_id]
 
-            if failures and failures % 100 == 0:  # every 10s except first time
+            try:
+                await asyncio.wait_for(
+                    self._client_ready[user_id].wait(), timeout=10,
+                )
+            except asyncio.TimeoutError:
+                waited += 10
                 log.warning(
                     "Client %r not found after %ds, stack trace:\n%s",
-                    user_id, failures / 10, traceback.format_stack(),
+                    user_id, waited, traceback.format_stack(),
                 )
 
-            await asyncio.sleep(0.1)
-            failures += 1
-
 
     async def get_any_client(self) -> MatrixClient:
-        """Return any healthy syncing `MatrixClient` registered in model."""
+        """Return any healthy syncing `MatrixClient` registered in model.
 
-        failures = 0
+        The last returned client is reused as long as it is still registered
+        and syncing, to avoid scanning all clients for every call.
+        """
+
+        last = self._last_healthy_client
+
+        if last and last.syncing and self.clients.get(last.user_id) is last:
+            return last
+
+        waited = 0
 
         while True:
-            for client in self.clients.values():
+            for client in self._clients_snapshot:
                 if client.syncing:
+                    self._last_healthy_client = client
                     return client
 
-            if failures and failures % 300 == 0:
+            # No registered client is actually syncing, wait for one to start
+            self.any_client_syncing.clear()
+
+            try:
+                await asyncio.wait_for(
+                    self.any_client_syncing.wait(), timeout=30,
+                )
+            except asyncio.TimeoutError:
+                waited += 30
                 log.warn(
                     "No healthy client found after %ds, stack trace:\n%s",
-                    failures / 10, traceback.format_stack(),
+                    waited, traceback.format_stack(),
                 )
 
-            await asyncio.sleep(0.1)
-            failures += 1
-
 
     # Client functions that don't need authentification
 
     async def get_profile(self, user_id: str) -> nio.ProfileGetResponse:
-        """Cache and return the matrix profile of `user_id`."""
+        """Cache and return the matrix profile of `user_id`.
+
+        Cached profiles are returned immediately if they are fresh
+        (see `PROFILE_FRESH_TTL`).
+        Stale profiles are also returned immediately, but a refresh is
+        started in the background.
+        Expired profiles (see `PROFILE_STALE_TTL`) or profiles not cached yet
+        are fetched before returning.
+        """
+
+        cached = self.profile_cache.get(user_id)
+
+        if cached:
+            self.profile_cache.move_to_end(user_id)
+            fetch_date, response = cached
+            age                  = time() - fetch_date
+
+            if age < PROFILE_FRESH_TTL:
+                return response
+
+            if age < PROFILE_STALE_TTL:
+                if user_id not in self._profile_refreshing:
+                    task = asyncio.ensure_future(
+                        self._revalidate_profile(user_id),
+                    )
+                    self._profile_refreshing[user_id] = task
+
+                    task.add_done_callback(
+                        lambda _: self._profile_refreshing.pop(user_id, None),
+                    )
+
+                return response
+
+        async with weak_lock(self.get_profile_locks, user_id):
+            # The profile may have been fetched while we waited for the lock
+            cached = self.profile_cache.get(user_id)
+
+            if cached and time() - cached[0] < PROFILE_FRESH_TTL:
+                return cached[1]
+
+            return await self._fetch_profile(user_id)
+
+
+    async def _fetch_profile(self, user_id: str) -> nio.ProfileGetResponse:
+        """Fetch the profile of `user_id` and update `profile_cache`.
+
+        The request is queued and sent along with other profile requests
+        made around the same time, see `_profile_fetcher_loop()`.
+        """
+
+        future = self._profile_queue.get(user_id)
+
+        if not future:
+            future = asyncio.get_event_loop().create_future()
+            self._profile_queue[user_id] = future
+            self._profile_queued.set()
+
+        # Don't let a cancelled caller cancel the fetch for other waiters
+        return await asyncio.shield(future)
+
 
-        if user_id in self.profile_cache:
-            return self.profile_cache[user_id]
+    async def _profile_fetcher_loop(self) -> None:
+        """Fetch the profiles queued by `_fetch_profile()` in batches."""
 
-        async with self.get_profile_locks[user_id]:
-            client   = await self.get_any_client()
-            response = await client.get_profile(user_id)
+        while True:
+            await self._profile_queued.wait()
+            await asyncio.sleep(0.02)  # let more requests join this batch
+
+            self._profile_queued.clear()
+            batch, self._profile_queue = self._profile_queue, {}
+            self._profile_sent.update(batch)
+
+            asyncio.ensure_future(self._fetch_profile_batch(batch))
+
+
+    async def _fetch_profile_batch(
+        self, batch: Dict[str, asyncio.Future],
+    ) -> None:
+        """Fetch profiles concurrently and set their futures' results."""
+
+        client    = await self.get_any_client()
+        responses = await asyncio.gather(
+            *(client.get_profile(user_id) for user_id in batch),
+            return_exceptions = True,
+        )
+
+        for (user_id, future), response in zip(batch.items(), responses):
+            # If the profile was invalidated while this request was running,
+            # the response may predate the change and must not be cached
+            up_to_date = self._profile_sent.get(user_id) is future
+
+            if up_to_date:
+                del self._profile_sent[user_id]
+
+            if future.done():
+                continue
+
+            if isinstance(response, BaseException):
+                future.set_exception(response)
+                continue
+
+            if up_to_date:
+                self.profile_cache[user_id] = (time(), response)
+                self.profile_cache.move_to_end(user_id)
+                self._profile_cache_dirty = True
+
+            future.set_result(response)
+
+        self._trim_profile_cache()
+
+
+    async def _revalidate_profile(self, user_id: str) -> None:
+        """Refresh the stale cached profile of `user_id` in the background."""
+
+        try:
+            async with weak_lock(self.get_profile_locks, user_id):
+                await self._fetch_profile(user_id)
+        except MatrixError as err:
+            log.warning("Failed refreshing profile of %s: %r", user_id, err)
+
+
+    def _trim_profile_cache(self) -> None:
+        """Drop least recently used profiles until the cache fits its size.
+
+        The maximum size is the `maxCachedProfiles` UI setting, or
+        `MAX_CACHED_PROFILES` if the setting isn't read yet or is invalid.
+        """
+
+        try:
+            max_size = self.ui_settings["maxCachedProfiles"]
+        except RuntimeError:  # settings file not read yet
+            max_size = MAX_CACHED_PROFILES
+
+        if isinstance(max_size, bool) or not isinstance(max_size, int) or \
+                max_size < 0:
+            max_size = MAX_CACHED_PROFILES
+
+        while len(self.profile_cache) > max_size:
+            self.profile_cache.popitem(last=False)
+
+
+    def invalidate_profile(self, user_id: str) -> None:
+        """Forget the cached profile of `user_id`, e.g. after it changed.
 
-            self.profile_cache[user_id] = response
-            return response
+        Any running background refresh for this profile is cancelled, and
+        the response of an already sent request won't be cached.
+        The next `get_profile()` call will fetch the profile again.
+        """
+
+        if self.profile_cache.pop(user_id, None):
+            self._profile_cache_dirty = True
+
+        self._profile_sent.pop(user_id, None)
+
+        task = self._profile_refreshing.get(user_id)
+
+        if task:
+            task.cancel()
+
+
+    async def _load_saved_profiles(self) -> None:
+        """Load profiles saved on disk, then start `_save_profiles_loop()`.
+
+        Saved profiles are loaded into `profile_cache`, keeping their
+        original fetch date so that they expire normally.
+        Invalid entries in the file are skipped.
+        """
+
+        try:
+            saved = await self.saved_profiles.read()
+        except Exception as err:  # e.g. JSON data that isn't an object
+            log.warning("Failed loading saved profiles: %r", err)
+            saved = {}
+
+        loaded = []
+
+        for user_id, info in saved.items():
+            try:
+                date        = float(info["date"])
+                displayname = info.get("displayname") or None
+                avatar_url  = info.get("avatar_url") or None
+
+                for value in (displayname, avatar_url):
+                    if not isinstance(value, (str, type(None))):
+                        raise TypeError(value)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                log.warning("Ignoring invalid saved profile %r", user_id)
+                continue
+
+            if user_id not in self.profile_cache:
+                response = nio.ProfileGetResponse(
+                    displayname = displayname, avatar_url = avatar_url,
+                )
+                loaded.append((user_id, (date, response)))
+
+        loaded.sort(key=lambda item: item[1][0])
+
+        # Profiles fetched since startup are more recent, keep them last
+        loaded.extend(self.profile_cache.items())
+        self.profile_cache = OrderedDict(loaded)
+
+        self._trim_profile_cache()
+
+        asyncio.ensure_future(self._save_profiles_loop())
+
+
+    async def _save_profiles_loop(self) -> None:
+        """Write `profile_cache` to disk every 5 seconds if it changed."""
+
+        while True:
+            await asyncio.sleep(5)
+
+            if not self._profile_cache_dirty:
+                continue
+
+            self._profile_cache_dirty = False
+
+            await self.saved_profiles.write({
+                user_id: {
+                    "date":        date,
+                    "displayname": response.displayname or "",
+                    "avatar_url":  response.avatar_url or "",
+                }
+                for user_id, (date, response) in self.profile_cache.items()
+            })
 
 
     async def thumbnail(
@@ -250,10 +563,12 @@ class Backend:
     async def load_settings(self) -> tuple:
         """Return parsed user config files."""
 
-        settings = await self.ui_settings.read()
-        ui_state = await self.ui_state.read()
-        history  = await self.history.read()
-        theme    = await Theme(self, settings["theme"]).read()
+        settings, ui_state, history = await asyncio.gather(
+            self.ui_settings.read(), self.ui_state.read(), self.history.read(),
+        )
+
+        # The theme to read depends on the settings
+        theme = await Theme(self, settings["theme"]).read()
 
         return (settings, ui_state, history, theme)
 
@@ -278,11 +278,20 @@ class MatrixClient(nio.AsyncClient):
         )
         self.server_config_task.add_done_callback(on_server_config_response)
 
+        def on_sync_stopped(_future) -> None:
+            """Clear `Backend.any_client_syncing` if no client is syncing."""
+
+            if not any(c.syncing for c in self.backend.clients.values()):
+                self.backend.any_client_syncing.clear()
+
         while True:
             try:
                 self.sync_task = asyncio.ensure_future(
                     self.sync_forever(timeout=10_000),
                 )
+                self.sync_task.add_done_callback(on_sync_stopped)
+                self.backend.any_client_syncing.set()
+
                 await self.sync_task
                 break  # task cancelled
             except Exception as err:
@@ -663,7 +672,7 @@ class MatrixClient(nio.AsyncClient):
         self.send_message_tasks[transaction_id] = \
             current_task()  # type: ignore
 
-        async with self.backend.send_locks[room_id]:
+        async with utils.weak_lock(self.backend.send_locks, room_id):
             await self.room_send(
                 room_id                   = room_id,
                 message_type              = "m.room.message",
@@ -1026,6 +1035,26 @@ class MatrixClient(nio.AsyncClient):
         return UploadReturn(response.content_uri, mime, decryption_dict)
 
 
+    async def set_displayname(
+        self, displayname: str,
+    ) -> nio.ProfileSetDisplayNameResponse:
+        """Set our display name and forget our outdated cached profile."""
+
+        response = await super().set_displayname(displayname)
+        self.backend.invalidate_profile(self.user_id)
+        return response
+
+
+    async def set_avatar(
+        self, avatar_url: str,
+    ) -> nio.ProfileSetAvatarResponse:
+        """Set our avatar and forget our outdated cached profile."""
+
+        response = await super().set_avatar(avatar_url)
+        self.backend.invalidate_profile(self.user_id)
+        return response
+
+
     async def set_avatar_from_file(self, path: Union[Path, str]) -> None:
         """Upload an image to the homeserver and set it as our avatar."""
 
@@ -1147,8 +1176,12 @@ class MatrixClient(nio.AsyncClient):
         can_send_state = partial(levels.can_user_send_state, self.user_id)
         can_send_msg   = partial(levels.can_user_send_message, self.user_id)
 
+        # Look these models up once, this function runs for every event
+        rooms   = self.models[self.user_id, "rooms"]
+        members = self.models[self.user_id, room.room_id, "members"]
+
         try:
-            registered      = self.models[self.user_id, "rooms"][room.room_id]
+            registered      = rooms[room.room_id]
             last_event_date = registered.last_event_date
             typing_members  = registered.typing_members
             mentions        = registered.mentions
@@ -1157,7 +1190,7 @@ class MatrixClient(nio.AsyncClient):
             typing_members  = []
             mentions        = 0
 
-        self.models[self.user_id, "rooms"][room.room_id] = Room(
+        rooms[room.room_id] = Room(
             id             = room.room_id,
             given_name     = room.name or "",
             display_name   = room.display_name or "",
@@ -1195,13 +1228,11 @@ class MatrixClient(nio.AsyncClient):
 
         # List members that left the room, then remove them from our model
         left_the_room = [
-            user_id
-            for user_id in self.models[self.user_id, room.room_id, "members"]
-            if user_id not in room.users
+            user_id for user_id in members if user_id not in room.users
         ]
 
         for user_id in left_the_room:
-            del self.models[self.user_id, room.room_id, "members"][user_id]
+            del members[user_id]
             HTML.rooms_user_id_names[room.room_id].pop(user_id, None)
 
         # Add the room members to the added room
@@ -1216,7 +1247,7 @@ class MatrixClient(nio.AsyncClient):
                 invited      = member.invited,
             ) for user_id, member in room.users.items()
         }
-        self.models[self.user_id, room.room_id, "members"].update(new_dict)
+        members.update(new_dict)
 
         for user_id, member in room.users.items():
             if member.display_name:
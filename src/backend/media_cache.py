@@ -10,7 +10,7 @@ import shutil
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, DefaultDict, Dict, Optional
+from typing import TYPE_CHECKING, Any, ClassVar, DefaultDict, Dict, Optional
 from urllib.parse import urlparse
 
 from PIL import Image as PILImage
@@ -27,7 +27,9 @@ if sys.version_info < (3, 8):
 
 CryptDict = Optional[Dict[str, Any]]
 
-CONCURRENT_DOWNLOADS_LIMIT                   = asyncio.BoundedSemaphore(8)
+# Thumbnails are small, allow more of them to be fetched at the same time
+CONCURRENT_DOWNLOADS_LIMIT                   = asyncio.BoundedSemaphore(4)
+CONCURRENT_THUMBNAILS_LIMIT                  = asyncio.BoundedSemaphore(16)
 ACCESS_LOCKS: DefaultDict[str, asyncio.Lock] = DefaultDict(asyncio.Lock)
 
 
@@ -79,6 +81,8 @@ class MediaCache:
 class Media:
     """A matrix media file."""
 
+    concurrent_limit: ClassVar[asyncio.Semaphore] = CONCURRENT_DOWNLOADS_LIMIT
+
     cache:      "MediaCache" = field()
     mxc:        str          = field()
     title:      str          = field()
@@ -133,7 +137,7 @@ class Media:
     async def create(self) -> Path:
         """Download and cache the media file to disk."""
 
-        async with CONCURRENT_DOWNLOADS_LIMIT:
+        async with self.concurrent_limit:
             data = await self._get_remote_data()
 
         self.local_path.parent.mkdir(parents=True, exist_ok=True)
@@ -226,6 +230,8 @@ class Media:
 class Thumbnail(Media):
     """The thumbnail of a matrix media, which is a media itself."""
 
+    concurrent_limit: ClassVar[asyncio.Semaphore] = CONCURRENT_THUMBNAILS_LIMIT
+
     cache:       "MediaCache" = field()
     mxc:         str          = field()
     title:       str          = field()
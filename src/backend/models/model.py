@@ -1,6 +1,6 @@
 # SPDX-License-Identifier: LGPL-3.0-or-later
 
-from bisect import bisect
+from bisect import bisect, bisect_left
 from threading import RLock
 from typing import (
     TYPE_CHECKING, Any, Dict, Iterator, List, MutableMapping, Optional,
@@ -99,7 +99,7 @@ class Model(MutableMapping):
             item.parent_model = None
             del self._data[key]
 
-            index = self._sorted_data.index(item)
+            index = self._index_of(item)
             del self._sorted_data[index]
 
             if self.sync_id:
@@ -119,13 +119,61 @@ class Model(MutableMapping):
         return str(self.sync_id) < str(other.sync_id)
 
 
+    def _index_of(self, item: "ModelItem") -> int:
+        """Return the position of an item in the sorted data.
+
+        The item must be in the model, and its fields must not have changed
+        since it was placed in the sorted data.
+        A binary search is used to find the position, then the item itself
+        is looked for among items that sort the same way.
+        """
+
+        data  = self._sorted_data
+        index = bisect_left(data, item)
+
+        while index < len(data) and not item < data[index]:
+            if data[index] is item:
+                return index
+
+            index += 1
+
+        raise ValueError(f"{item!r} not found in {self}")
+
+
     def clear(self) -> None:
-        super().clear()
+        """Remove all items, QML is informed with a single `ModelCleared`.
+
+        Unlike the `MutableMapping` implementation, this doesn't delete
+        (and search for the position of) every item one by one.
+        """
+
+        with self._write_lock:
+            for item in self._sorted_data:
+                item.parent_model = None
+
+            self._data.clear()
+            del self._sorted_data[:]
+
         if self.sync_id:
             ModelCleared(self.sync_id)
 
 
     def copy(self, sync_id: Optional[SyncId] = None) -> "Model":
+        """Return a new model containing the same items.
+
+        If no `sync_id` is passed, the copy isn't synced with QML and the
+        already sorted items are copied in bulk, instead of being inserted
+        one by one.
+        """
+
         new = type(self)(sync_id=sync_id)
-        new.update(self)
+
+        if sync_id:
+            new.update(self)
+            return new
+
+        with self._write_lock:
+            new._data        = self._data.copy()
+            new._sorted_data = blist(self._sorted_data)
+
         return new
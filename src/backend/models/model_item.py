@@ -1,5 +1,6 @@
 # SPDX-License-Identifier: LGPL-3.0-or-later
 
+from bisect import bisect
 from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from ..pyotherside_events import ModelItemFieldChanged
@@ -26,21 +27,35 @@ class ModelItem:
 
 
     def __setattr__(self, name: str, value) -> None:
-        """If this item is in a `Model`, alert it of attribute changes."""
+        """If this item is in a `Model`, alert it of attribute changes.
 
-        if name == "parent_model" or self.parent_model is None:
+        Any change also invalidates the cached `serialized` dict.
+        """
+
+        if name == "parent_model":
             super().__setattr__(name, value)
             return
 
+        if self.parent_model is None:
+            super().__setattr__(name, value)
+            self.__dict__.pop("_serialized_cache", None)
+            return
+
         if getattr(self, name) == value:
             return
 
         with self.parent_model._write_lock:
+            # Move the item to its new sorted position, instead of sorting
+            # all the data again
+            data      = self.parent_model._sorted_data
+            old_index = self.parent_model._index_of(self)
+            del data[old_index]
+
             super().__setattr__(name, value)
+            self.__dict__.pop("_serialized_cache", None)
 
-            old_index = self.parent_model._sorted_data.index(self)
-            self.parent_model._sorted_data.sort()
-            new_index = self.parent_model._sorted_data.index(self)
+            new_index = bisect(data, self)
+            data.insert(new_index, self)
 
             if self.parent_model.sync_id:
                 ModelItemFieldChanged(
@@ -65,11 +80,23 @@ class ModelItem:
 
     @property
     def serialized(self) -> Dict[str, Any]:
-        """Return this item as a dict ready to be passed to QML."""
-
-        return {
-            name: self.serialize_field(name) for name in dir(self)
-            if not (
-                name.startswith("_") or name in ("parent_model", "serialized")
-            )
-        }
+        """Return this item as a dict ready to be passed to QML.
+
+        The dict is cached until one of the item's attributes is set again.
+        Fields containing mutable values (e.g. lists) must thus be replaced
+        rather than modified in place for changes to be seen.
+        """
+
+        cached = self.__dict__.get("_serialized_cache")
+
+        if cached is None:
+            cached = {
+                name: self.serialize_field(name) for name in dir(self)
+                if not (
+                    name.startswith("_") or
+                    name in ("parent_model", "serialized")
+                )
+            }
+            self.__dict__["_serialized_cache"] = cached
+
+        return cached
@@ -328,6 +328,13 @@ class NioCallbacks:
             ))
 
         if changed:
+            # Forget the cached profile if this change happened after it was
+            # fetched, and not e.g. when loading past events
+            cached = self.client.backend.profile_cache.get(ev.state_key)
+
+            if not cached or cached[0] < ev_date.timestamp():
+                self.client.backend.invalidate_profile(ev.state_key)
+
             # Update our account profile if the event is newer than last update
             if ev.state_key == self.client.user_id:
                 account = self.client.models["accounts"][self.client.user_id]
@@ -7,6 +7,7 @@ import json
 import os
 import platform
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, ClassVar, Dict, Optional
 
@@ -24,6 +25,9 @@ JsonData = Dict[str, Any]
 
 WRITE_LOCK = asyncio.Lock()
 
+# Default maximum number of profiles the Backend keeps in its cache
+MAX_CACHED_PROFILES = 8192
+
 
 @dataclass
 class DataFile:
@@ -64,11 +68,21 @@ class DataFile:
         return ""
 
 
+    async def read_text(self) -> str:
+        """Return the file's content without blocking the asyncio loop.
+
+        `FileNotFoundError` is raised if the file doesn't exist.
+        """
+
+        async with aiofiles.open(self.path) as file:
+            return await file.read()
+
+
     async def read(self):
         """Return content of the existing file on disk, or default content."""
 
         try:
-            return self.path.read_text()
+            return await self.read_text()
         except FileNotFoundError:
             default = await self.default_data()
 
@@ -135,7 +149,7 @@ class JSONDataFile(DataFile):
         """
 
         try:
-            data = json.loads(self.path.read_text())
+            data = json.loads(await self.read_text())
         except FileNotFoundError:
             if not self.create_missing:
                 data       = await self.default_data()
@@ -227,6 +241,7 @@ class UISettings(JSONDataFile):
             "hideProfileChangeEvents": True,
             "hideMembershipEvents": False,
             "hideUnknownEvents": False,
+            "maxCachedProfiles": MAX_CACHED_PROFILES,
             "theme": "Midnight.qpl",
             "writeAliases": {},
             "media": {
@@ -328,6 +343,39 @@ class History(JSONDataFile):
         return {"console": []}
 
 
+@dataclass
+class ProfileCache(JSONDataFile):
+    """Cache file for matrix user profiles fetched by the `Backend`."""
+
+    filename: str = "profiles.json"
+
+
+    @property
+    def path(self) -> Path:
+        return Path(self.backend.appdirs.user_cache_dir) / self.filename
+
+
+    async def read(self) -> JsonData:
+        """Return the saved profiles without keeping a copy of them.
+
+        The `Backend` moves the returned data into its own cache.
+        """
+
+        data       = await super().read()
+        self._data = None
+        return data
+
+
+    async def write(self, data: JsonData) -> None:
+        """Dump compact JSON in a thread, since the cache can be large."""
+
+        dump = partial(
+            json.dumps, data, ensure_ascii=False, separators=(",", ":"),
+        )
+        js = await asyncio.get_event_loop().run_in_executor(None, dump)
+        await DataFile.write(self, js)
+
+
 @dataclass
 class Theme(DataFile):
     """A theme file defining the look of QML components."""
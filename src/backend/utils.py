@@ -2,6 +2,7 @@
 
 """Various utilities that are used throughout the package."""
 
+import asyncio
 import collections
 import html
 import inspect
@@ -19,6 +20,7 @@ from typing import (
     Any, AsyncIterator, Callable, Dict, Mapping, Sequence, Tuple, Type, Union,
 )
 from uuid import UUID
+from weakref import WeakValueDictionary
 
 import aiofiles
 import filetype
@@ -63,6 +65,26 @@ def dict_update_recursive(dict1: dict, dict2: dict) -> None:
             dict1[k] = dict2[k]
 
 
+def weak_lock(
+    locks: "WeakValueDictionary[Any, asyncio.Lock]", key: Any,
+) -> asyncio.Lock:
+    """Return the lock for `key` in `locks`, creating it if needed.
+
+    Since `locks` only weakly references its values, a lock is automatically
+    dropped from it once no coroutine uses it anymore.
+    The returned lock must be kept referenced while in use, e.g.
+    `async with weak_lock(locks, key): ...`.
+    """
+
+    lock = locks.get(key)
+
+    if lock is None:
+        lock       = asyncio.Lock()
+        locks[key] = lock
+
+    return lock
+
+
 async def is_svg(file: File) -> bool:
     """Return whether the file is a SVG (`lxml` is used for detection)."""
 